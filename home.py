@@ -80,6 +80,8 @@ else:
         """, unsafe_allow_html=True)
 
     def main():
+        helper.begin_session_run()
+
         if 'dark_mode' not in st.session_state:
             st.session_state.dark_mode = False
 
@@ -87,6 +89,7 @@ else:
         st.sidebar.header("🍎 Apel Indonesia")
 
         if st.sidebar.button("Logout"):
+            helper.end_session()
             st.session_state['authentication_status'] = None
             st.session_state['name'] = None
             st.session_state['username'] = None
@@ -130,13 +133,14 @@ else:
             input_method = st.sidebar.radio("Pilih metode input gambar:", ["Upload Gambar", "Kamera Langsung"])
 
             if input_method == "Upload Gambar":
+                profile = helper.display_profile_options(settings.UPLOAD)
                 source_img = st.file_uploader("Pilih gambar..", type=("jpg", "jpeg", "png"))
                 show_mobile_warning()
                 
                 if source_img:
                     img = PIL.Image.open(source_img)
                     if st.button("Detect Objects"):
-                        res = model.predict(img, conf=confidence)
+                        res = helper.predict_image(confidence, model, img, profile)
                         boxes = res[0].boxes
                         plotted = res[0].plot()[:, :, ::-1]
 
@@ -162,12 +166,10 @@ else:
                                 else:
                                     penjelasan_list.append(f"**{label}**: Info tidak tersedia")
 
-                            if 'history' not in st.session_state:
-                                st.session_state.history = []
-                            st.session_state.history.append({
+                            helper.add_history({
                                 "image": img,
                                 "result": plotted,
-                                "boxes": boxes,
+                                "boxes": boxes.data.cpu().numpy(),
                                 "penjelasan": penjelasan_list
                             })
 
@@ -179,10 +181,11 @@ else:
                             st.warning("File penyakit_apple_info.json tidak ditemukan")
 
             elif input_method == "Kamera Langsung":
+                profile = helper.display_profile_options(settings.CAMERA)
                 camera_image = st.camera_input("Ambil Foto dengan Kamera")
                 if camera_image:
                     camera_img = PIL.Image.open(camera_image)
-                    res_cam = model.predict(camera_img, conf=confidence)
+                    res_cam = helper.predict_image(confidence, model, camera_img, profile)
                     boxes_cam = res_cam[0].boxes
                     plotted_cam = res_cam[0].plot()[:, :, ::-1]
 
@@ -208,12 +211,10 @@ else:
                             else:
                                 penjelasan_list.append(f"**{label}**: Info tidak tersedia")
 
-                        if 'history' not in st.session_state:
-                            st.session_state.history = []
-                        st.session_state.history.append({
+                        helper.add_history({
                             "image": camera_img,
                             "result": plotted_cam,
-                            "boxes": boxes_cam,
+                            "boxes": boxes_cam.data.cpu().numpy(),
                             "penjelasan": penjelasan_list
                         })
 
@@ -226,15 +227,16 @@ else:
 
         elif selected_menu == "History":
             st.header("Detection History")
-            if st.session_state.get('history'):
-                for idx, rec in enumerate(st.session_state.history):
+            history = helper.get_history()
+            if history:
+                for idx, rec in enumerate(history):
                     st.subheader(f"Record {idx + 1}")
                     st.image(rec['image'], caption=f"Image {idx + 1}", use_column_width=True)
                     st.image(rec['result'], caption=f"Result {idx + 1}", use_column_width=True)
                     if 'boxes' in rec:
                         with st.expander(f"Boxes Detail {idx + 1}"):
                             for box in rec['boxes']:
-                                st.write(box.data)
+                                st.write(box)
                     if 'penjelasan' in rec:
                         with st.expander(f"Penjelasan Penyakit {idx + 1}"):
                             for p in rec['penjelasan']:
@@ -262,6 +264,7 @@ else:
             [data-testid="stSidebar"] {background-color:#FFA62F; color:#000;}
             </style>""", unsafe_allow_html=True)
 
+        helper.display_session_usage()
         st.sidebar.image("images/poon.png", use_column_width=True)
 
     if __name__ == "__main__":
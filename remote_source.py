@@ -0,0 +1,297 @@
+import hashlib
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import cv2
+import requests
+
+import settings
+
+
+class RemoteVideo:
+    """
+    A remote video that is downloaded in the background into the local cache.
+
+    The download appends chunks to `<key>.part` and renames it to `<key>.mp4`
+    once it is complete, so an interrupted download is resumed with an HTTP
+    Range request on the next run instead of starting over.
+    """
+
+    def __init__(self, url, part_path, final_path, chunk_size, retries, timeout, on_complete=None):
+        self.url = url
+        self.part_path = part_path
+        self.final_path = final_path
+        self.chunk_size = chunk_size
+        self.retries = retries
+        self.timeout = timeout
+        self.on_complete = on_complete
+        self.bytes_downloaded = 0
+        self.total_bytes = None
+        self.error = None
+        self._complete = final_path.exists()
+        self._condition = threading.Condition()
+        self._thread = None
+
+    @property
+    def path(self):
+        return self.final_path if self._complete else self.part_path
+
+    @property
+    def is_complete(self):
+        return self._complete
+
+    def start(self):
+        if self._complete or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._download, daemon=True)
+        self._thread.start()
+
+    def is_alive(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def wait_for(self, min_bytes, timeout=None):
+        """
+        Blocks until at least `min_bytes` are on disk, the download is complete or it failed.
+
+        Returns:
+            bool: True if the data is available, False on timeout.
+
+        Raises:
+            The download error, if the download failed.
+        """
+        with self._condition:
+            ready = self._condition.wait_for(
+                lambda: self._complete or self.error is not None or self.bytes_downloaded >= min_bytes,
+                timeout=timeout)
+        if self.error is not None:
+            raise self.error
+        return ready
+
+    def _download(self):
+        attempts = 0
+        while True:
+            try:
+                self._download_once()
+                return
+            except (requests.RequestException, OSError) as e:
+                attempts += 1
+                if attempts > self.retries:
+                    with self._condition:
+                        self.error = e
+                        self._condition.notify_all()
+                    return
+                time.sleep(min(2 ** attempts, 30))
+
+    def _download_once(self):
+        offset = self.part_path.stat().st_size if self.part_path.exists() else 0
+        headers = {'Range': f'bytes={offset}-'} if offset else {}
+
+        with requests.get(self.url, headers=headers, stream=True, timeout=self.timeout) as response:
+            if response.status_code == 416:
+                # The partial file already holds the whole video
+                self._finish()
+                return
+            response.raise_for_status()
+            if offset and response.status_code != 206:
+                # The server ignored the Range header, start over
+                offset = 0
+            content_length = response.headers.get('Content-Length')
+            if content_length is not None:
+                self.total_bytes = offset + int(content_length)
+
+            with self._condition:
+                self.bytes_downloaded = offset
+                self._condition.notify_all()
+
+            with open(self.part_path, 'ab' if offset else 'wb') as part_file:
+                for chunk in response.iter_content(chunk_size=self.chunk_size):
+                    part_file.write(chunk)
+                    part_file.flush()
+                    with self._condition:
+                        self.bytes_downloaded += len(chunk)
+                        self._condition.notify_all()
+
+        if self.total_bytes is not None and self.bytes_downloaded < self.total_bytes:
+            raise requests.ConnectionError(
+                f"Download ended early at {self.bytes_downloaded} of {self.total_bytes} bytes")
+        self._finish()
+
+    def _finish(self):
+        os.replace(self.part_path, self.final_path)
+        with self._condition:
+            self.bytes_downloaded = self.final_path.stat().st_size
+            self.total_bytes = self.bytes_downloaded
+            self._complete = True
+            self._condition.notify_all()
+        if self.on_complete is not None:
+            self.on_complete()
+
+
+class RemoteVideoCache:
+    """
+    A local on-disk cache of remote videos with size-based LRU eviction.
+
+    Parameters:
+        cache_dir (Path): Directory that holds the cached videos.
+        max_bytes (int): Videos not being downloaded are evicted, least recently used first, beyond this size.
+        chunk_size (int): Size of the chunks written to disk while downloading.
+        retries (int): Number of times a failed download is resumed before giving up.
+        timeout (float): Network timeout in seconds.
+    """
+
+    def __init__(self,
+                 cache_dir=settings.REMOTE_CACHE_DIR,
+                 max_bytes=settings.REMOTE_CACHE_MAX_BYTES,
+                 chunk_size=settings.REMOTE_CHUNK_SIZE,
+                 retries=settings.REMOTE_DOWNLOAD_RETRIES,
+                 timeout=settings.REMOTE_DOWNLOAD_TIMEOUT):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        self.retries = retries
+        self.timeout = timeout
+        self._videos = {}
+        self._lock = threading.Lock()
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    def _key(self, key):
+        return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+    def open_cached(self, key):
+        """
+        Returns the completely downloaded `RemoteVideo` stored under `key`, or None if it is not cached.
+
+        The check and the open happen under the cache lock, so the video cannot be evicted in between.
+        """
+        name = self._key(key)
+        with self._lock:
+            if not (self.cache_dir / f'{name}.mp4').exists():
+                return None
+            return self._open(None, name)
+
+    def open(self, url, key=None):
+        """
+        Returns the `RemoteVideo` for `url`, starting its background download if needed.
+
+        Parameters:
+            url (str): The http(s) url of the video file.
+            key (str): Cache key, defaults to `url`. Use a stable key when the download url is signed or expires.
+
+        Returns:
+            RemoteVideo: The cached or downloading video.
+
+        Raises:
+            ValueError: If `url` is None and the video is not cached.
+        """
+        name = self._key(key or url)
+        with self._lock:
+            return self._open(url, name)
+
+    def _open(self, url, name):
+        if url is None and not (self.cache_dir / f'{name}.mp4').exists():
+            raise ValueError("The video is not cached and no url was given to download it")
+        video = self._videos.get(name)
+        if video is None or (video.error is not None and not video.is_alive()):
+            video = RemoteVideo(url,
+                                self.cache_dir / f'{name}.part',
+                                self.cache_dir / f'{name}.mp4',
+                                self.chunk_size,
+                                self.retries,
+                                self.timeout,
+                                on_complete=self.evict)
+            self._videos[name] = video
+        if video.is_complete:
+            # Mark the video as recently used for the LRU eviction
+            os.utime(video.final_path)
+        else:
+            self._evict(exclude=name)
+            video.start()
+        return video
+
+    def evict(self):
+        """
+        Removes least recently used videos until the cache fits in `max_bytes`.
+
+        Partial downloads that are not running (failed, or never requested again) are evicted
+        like completed videos, so they cannot grow the cache past its size.
+        """
+        with self._lock:
+            self._evict()
+
+    def _evict(self, exclude=None):
+        files = [p for p in self.cache_dir.iterdir() if p.suffix in ('.mp4', '.part')]
+        total = sum(p.stat().st_size for p in files)
+        candidates = sorted((p for p in files if p.stem != exclude),
+                            key=lambda p: p.stat().st_mtime)
+        for path in candidates:
+            if total <= self.max_bytes:
+                break
+            video = self._videos.get(path.stem)
+            if video is not None and video.is_alive():
+                continue
+            total -= path.stat().st_size
+            path.unlink()
+            self._videos.pop(path.stem, None)
+
+
+@contextmanager
+def _open_capture(source):
+    vid_cap = cv2.VideoCapture(source)
+    try:
+        yield vid_cap
+    finally:
+        vid_cap.release()
+
+
+def _safe_frame_count(vid_cap, video, downloaded, tail_bytes):
+    # Number of frames that lie at least `tail_bytes` before the end of the partial file
+    frame_count = vid_cap.get(cv2.CAP_PROP_FRAME_COUNT) if vid_cap.isOpened() else 0
+    if frame_count <= 0 or not video.total_bytes:
+        return 0
+    return int(frame_count * max(0, downloaded - tail_bytes) / video.total_bytes)
+
+
+def iter_frames(video, start_bytes=settings.REMOTE_START_BYTES, poll_timeout=5, open_capture=_open_capture):
+    """
+    Yields the frames of a `RemoteVideo` while it is still downloading.
+
+    Reading starts as soon as `start_bytes` are on disk. While the download is incomplete the reader
+    stays `start_bytes` behind the downloaded tail, so it never decodes a partially written sample.
+    The position in the file is estimated from the frame count and the total size, which needs a
+    video with its index at the start (faststart). When the reader reaches that limit it waits for
+    more data, reopens the file and seeks back to the next frame.
+
+    Parameters:
+        video (RemoteVideo): The video to read.
+        start_bytes (int): Bytes to buffer before the first frame is read, and to stay behind the tail.
+        poll_timeout (float): Seconds to wait for more data before checking again.
+        open_capture (callable): Returns a context manager that opens and releases a `cv2.VideoCapture`.
+
+    Yields:
+        numpy array: The next BGR frame.
+    """
+    video.wait_for(start_bytes)
+    position = 0
+    while True:
+        complete = video.is_complete
+        downloaded = video.bytes_downloaded
+        with open_capture(str(video.path)) as vid_cap:
+            if position:
+                vid_cap.set(cv2.CAP_PROP_POS_FRAMES, position)
+            safe_frames = None if complete else _safe_frame_count(vid_cap, video, downloaded, start_bytes)
+            while vid_cap.isOpened() and (safe_frames is None or position < safe_frames):
+                success, image = vid_cap.read()
+                if not success:
+                    break
+                position += 1
+                yield image
+
+        if complete:
+            return
+        # Wait until the download makes progress before reopening the file
+        while not video.wait_for(downloaded + video.chunk_size, timeout=poll_timeout):
+            if not video.is_alive() and not video.is_complete:
+                return
@@ -0,0 +1,132 @@
+import cv2
+import numpy as np
+
+import settings
+
+
+class RegionOfInterest:
+    """
+    A polygon region of interest for a fixed camera.
+
+    Only the bounding box of the polygon is sent to the model. Detections are mapped back to
+    full-frame coordinates and those whose center falls outside the polygon are discarded with
+    a lookup in a precomputed mask.
+
+    Parameters:
+        polygon (list): (x, y) points in normalized frame coordinates (0-1).
+    """
+
+    def __init__(self, polygon):
+        self.polygon = np.asarray(polygon, dtype=np.float32)
+        self._shape = None
+        self._points = None
+        self._mask = None
+        self._bbox = None
+
+    def _resolve(self, shape):
+        # The pixel polygon and mask only change when the frame size does
+        if shape == self._shape:
+            return
+        h, w = shape
+        points = np.round(self.polygon * [w - 1, h - 1]).astype(np.int32)
+        mask = np.zeros((h, w), dtype=np.uint8)
+        cv2.fillPoly(mask, [points], 1)
+        x, y, bw, bh = cv2.boundingRect(points)
+        if bw < 2 or bh < 2:
+            raise ValueError(f"Region of interest {self.polygon.tolist()} is less than 2 pixels wide or high "
+                             f"on a {w}x{h} frame")
+        self._shape = shape
+        self._points = points
+        self._mask = mask
+        self._bbox = (x, y, x + bw, y + bh)
+
+    def crop(self, image):
+        """
+        Returns the part of the frame inside the bounding box of the polygon.
+        """
+        self._resolve(image.shape[:2])
+        x0, y0, x1, y1 = self._bbox
+        return image[y0:y1, x0:x1]
+
+    def map_result(self, result, image):
+        """
+        Maps the detections of a crop back onto the full frame, in place.
+
+        Parameters:
+            result: An ultralytics result for the (possibly resized) crop.
+            image (numpy array): The full frame the crop was taken from.
+
+        Returns:
+            The result, with full-frame boxes inside the polygon and `image` as its original image.
+        """
+        self._resolve(image.shape[:2])
+        x0, y0, x1, y1 = self._bbox
+        crop_h, crop_w = result.orig_shape
+        h, w = image.shape[:2]
+
+        data = result.boxes.cpu().numpy().data.copy()
+        data[:, [0, 2]] = data[:, [0, 2]] * ((x1 - x0) / crop_w) + x0
+        data[:, [1, 3]] = data[:, [1, 3]] * ((y1 - y0) / crop_h) + y0
+
+        cx = ((data[:, 0] + data[:, 2]) / 2).astype(np.int32).clip(0, w - 1)
+        cy = ((data[:, 1] + data[:, 3]) / 2).astype(np.int32).clip(0, h - 1)
+        keep = self._mask[cy, cx].astype(bool)
+
+        result.orig_img = image
+        result.orig_shape = image.shape[:2]
+        result.update(boxes=data[keep])
+        return result
+
+    def draw(self, image):
+        """
+        Draws the polygon outline on a full frame.
+        """
+        self._resolve(image.shape[:2])
+        cv2.polylines(image, [self._points], True, (0, 255, 255), 2)
+        return image
+
+
+def validate_polygon(polygon):
+    """
+    Checks that a polygon has at least 3 points inside the frame and encloses a non-zero area.
+
+    Raises:
+        ValueError: With a description of what is wrong with the polygon.
+    """
+    points = np.asarray(polygon, dtype=np.float64)
+    if points.ndim != 2 or points.shape[1] != 2 or len(points) < 3:
+        raise ValueError(f"Region of interest must be a list of at least 3 (x, y) points, got {polygon}")
+    if (points < 0).any() or (points > 1).any():
+        raise ValueError(f"Region of interest points must be normalized between 0 and 1, got {polygon}")
+    x, y = points[:, 0], points[:, 1]
+    area = 0.5 * abs(np.dot(x, np.roll(y, 1)) - np.dot(y, np.roll(x, 1)))
+    if area < 1e-6:
+        raise ValueError(f"Region of interest {polygon} encloses no area, are the points collinear?")
+
+
+def get_source_roi(source, camera=None):
+    """
+    Returns the region of interest configured for a source, or None for the full frame.
+
+    Parameters:
+        source (str): One of the source names from `settings`.
+        camera: The RTSP url or webcam index. A polygon in `settings.CAMERA_ROI_POLYGONS` takes precedence.
+
+    Returns:
+        RegionOfInterest or None
+
+    Raises:
+        ValueError: If the configured polygon is invalid.
+    """
+    if camera in settings.CAMERA_ROI_POLYGONS:
+        setting, name = 'CAMERA_ROI_POLYGONS', camera
+    else:
+        setting, name = 'ROI_POLYGONS', source
+    polygon = getattr(settings, setting).get(name)
+    if polygon is None:
+        return None
+    try:
+        validate_polygon(polygon)
+    except ValueError as e:
+        raise ValueError(f"Invalid settings.{setting} entry for {name!r}: {e}") from e
+    return RegionOfInterest(polygon)
@@ -0,0 +1,227 @@
+import threading
+import time
+from contextlib import contextmanager
+
+import cv2
+import numpy as np
+
+import settings
+
+
+def estimate_bytes(obj):
+    """
+    Roughly estimates the memory held by a history record or one of its values.
+
+    Numpy arrays and tensors count their buffers, PIL images their decoded pixels.
+    """
+    if isinstance(obj, dict):
+        return sum(estimate_bytes(v) for v in obj.values())
+    if isinstance(obj, (list, tuple)):
+        return sum(estimate_bytes(v) for v in obj)
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if hasattr(obj, 'element_size') and hasattr(obj, 'nelement'):
+        return obj.element_size() * obj.nelement()
+    if hasattr(obj, 'getbands') and hasattr(obj, 'size'):
+        w, h = obj.size
+        return w * h * len(obj.getbands())
+    if isinstance(obj, (str, bytes)):
+        return len(obj)
+    return 0
+
+
+class SessionResources:
+    """
+    The history records and open video captures of one session.
+
+    Captures are only released by the thread that opened them. To end a session from another
+    thread, `stop_requested` is set and the video loops of the session stop at the next frame.
+    """
+
+    def __init__(self, user=None):
+        self.user = user
+        self.captures = {}
+        self.history = []
+        self.history_bytes = 0
+        self.last_seen = time.monotonic()
+        self.ended = False
+        self.stop_requested = threading.Event()
+
+    def clear_history(self):
+        self.history.clear()
+        self.history_bytes = 0
+
+    def pop_history(self):
+        record, size = self.history.pop(0)
+        self.history_bytes -= size
+        return record
+
+
+class SessionResourceManager:
+    """
+    Tracks per-session memory and open captures, and enforces the configured caps.
+
+    Parameters:
+        max_session_bytes (int): History memory allowed per session.
+        max_history (int): History records kept per session.
+        max_total_bytes (int): History memory allowed for all sessions together.
+        max_captures (int): Open video captures allowed per session.
+        idle_timeout (float): Seconds after which an idle session without open captures is released,
+            if `sweep` cannot tell whether it is connected. Ended sessions are forgotten after it.
+    """
+
+    def __init__(self,
+                 max_session_bytes=settings.SESSION_MAX_BYTES,
+                 max_history=settings.SESSION_MAX_HISTORY,
+                 max_total_bytes=settings.SESSIONS_MAX_BYTES,
+                 max_captures=settings.SESSION_MAX_CAPTURES,
+                 idle_timeout=settings.SESSION_IDLE_TIMEOUT):
+        self.max_session_bytes = max_session_bytes
+        self.max_history = max_history
+        self.max_total_bytes = max_total_bytes
+        self.max_captures = max_captures
+        self.idle_timeout = idle_timeout
+        self._sessions = {}
+        self._lock = threading.RLock()
+
+    def _session(self, session_id):
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = self._sessions[session_id] = SessionResources()
+        session.last_seen = time.monotonic()
+        return session
+
+    def begin_run(self, session_id, user=None):
+        """
+        Starts a script run of a session, reviving it if it was ended for being idle.
+        """
+        with self._lock:
+            session = self._session(session_id)
+            session.user = user
+            session.ended = False
+            session.stop_requested.clear()
+
+    def is_stopped(self, session_id):
+        """
+        Returns True if the video loops of the session should stop and release their captures.
+        """
+        session = self._sessions.get(session_id)
+        return session is not None and session.stop_requested.is_set()
+
+    @contextmanager
+    def capture(self, session_id, source):
+        """
+        Opens a `cv2.VideoCapture` for a session and releases it when the block exits, even on errors.
+
+        Raises:
+            RuntimeError: If the session already has `max_captures` open captures.
+        """
+        # Opening an unreachable stream can block for a long time, so only reserve the slot under
+        # the lock shared by all sessions and open the capture outside of it
+        reservation = object()
+        with self._lock:
+            session = self._session(session_id)
+            if len(session.captures) >= self.max_captures:
+                raise RuntimeError(f"This session already has {len(session.captures)} open video capture(s), "
+                                   f"the limit is {self.max_captures}")
+            session.captures[id(reservation)] = None
+        try:
+            vid_cap = cv2.VideoCapture(source)
+        except BaseException:
+            with self._lock:
+                session.captures.pop(id(reservation), None)
+            raise
+        with self._lock:
+            session.captures.pop(id(reservation), None)
+            session.captures[id(vid_cap)] = vid_cap
+        try:
+            yield vid_cap
+        finally:
+            with self._lock:
+                session.captures.pop(id(vid_cap), None)
+            vid_cap.release()
+
+    def add_history(self, session_id, record):
+        """
+        Adds a history record to a session, evicting the oldest records beyond the caps.
+        """
+        size = estimate_bytes(record)
+        with self._lock:
+            session = self._session(session_id)
+            session.history.append((record, size))
+            session.history_bytes += size
+            while session.history and (len(session.history) > self.max_history
+                                       or session.history_bytes > self.max_session_bytes):
+                session.pop_history()
+            self._evict_lru()
+
+    def _evict_lru(self):
+        # Drop the oldest records of the least recently active sessions first
+        total = sum(s.history_bytes for s in self._sessions.values())
+        for session in sorted(self._sessions.values(), key=lambda s: s.last_seen):
+            while session.history and total > self.max_total_bytes:
+                size = session.history[0][1]
+                session.pop_history()
+                total -= size
+            if total <= self.max_total_bytes:
+                break
+
+    def get_history(self, session_id):
+        with self._lock:
+            session = self._sessions.get(session_id)
+            return [record for record, _ in session.history] if session else []
+
+    def release_session(self, session_id):
+        """
+        Ends a session: drops its history and asks its video loops to stop.
+
+        Open captures are released by the loops that own them, not here.
+        """
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None:
+                self._end(session)
+
+    def _end(self, session):
+        session.ended = True
+        session.stop_requested.set()
+        session.clear_history()
+
+    def sweep(self, is_active=None):
+        """
+        Ends sessions that disconnected, or idle sessions without open captures when `is_active` is
+        not known. Ended sessions are forgotten once their captures are closed and `idle_timeout` passed.
+
+        Parameters:
+            is_active (callable): Returns whether a session id is still connected, if known.
+        """
+        now = time.monotonic()
+        with self._lock:
+            for session_id, session in list(self._sessions.items()):
+                idle = now - session.last_seen > self.idle_timeout
+                if session.ended:
+                    # Kept until then so a loop reopening a capture still sees the stop request
+                    if idle and not session.captures:
+                        del self._sessions[session_id]
+                elif is_active is not None:
+                    if not is_active(session_id):
+                        self._end(session)
+                elif idle and not session.captures:
+                    self._end(session)
+
+    def usage(self, session_id=None):
+        """
+        Returns a list with the user, open captures, history records, memory and idle time of each
+        running session, or only of `session_id` if given.
+        """
+        now = time.monotonic()
+        with self._lock:
+            return [{
+                'session': sid[:8],
+                'user': session.user,
+                'captures': len(session.captures),
+                'history': len(session.history),
+                'memory (MB)': round(session.history_bytes / 1024 ** 2, 1),
+                'idle (s)': int(now - session.last_seen),
+            } for sid, session in self._sessions.items()
+                if (session_id is None or sid == session_id) and not (session.ended and not session.captures)]
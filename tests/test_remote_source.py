@@ -0,0 +1,166 @@
+import http.server
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import remote_source  # noqa: E402
+
+VIDEO = Path(__file__).resolve().parents[1] / 'videos' / 'video_3.mp4'
+
+
+class RangeFileHandler(http.server.BaseHTTPRequestHandler):
+    """
+    Serves `data` with HTTP Range support, `delay` seconds per 16 KB to simulate a slow network.
+    """
+    data = b''
+    delay = 0
+    ranges = []
+
+    def do_GET(self):
+        byte_range = self.headers.get('Range')
+        self.ranges.append(byte_range)
+        start = int(byte_range.split('=')[1].split('-')[0]) if byte_range else 0
+        if start >= len(self.data):
+            self.send_response(416)
+            self.end_headers()
+            return
+
+        body = self.data[start:]
+        self.send_response(206 if byte_range else 200)
+        self.send_header('Content-Length', str(len(body)))
+        if byte_range:
+            self.send_header('Content-Range', f'bytes {start}-{len(self.data) - 1}/{len(self.data)}')
+        self.end_headers()
+        for i in range(0, len(body), 16384):
+            self.wfile.write(body[i:i + 16384])
+            time.sleep(self.delay)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class RemoteVideoCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.data = VIDEO.read_bytes()
+        self.handler = type('Handler', (RangeFileHandler,), {'data': self.data, 'ranges': []})
+        self.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), self.handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f'http://127.0.0.1:{self.server.server_port}/video.mp4'
+        self.cache_dir = Path(tempfile.mkdtemp())
+        self.cache = remote_source.RemoteVideoCache(self.cache_dir, chunk_size=64 * 1024, retries=0, timeout=5)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.cache_dir)
+
+    def test_download_and_replay_from_cache(self):
+        video = self.cache.open(self.url, key='video')
+        video.wait_for(len(self.data) + 1, timeout=10)
+        self.assertTrue(video.is_complete)
+        self.assertEqual(video.path.read_bytes(), self.data)
+
+        cache = remote_source.RemoteVideoCache(self.cache_dir)
+        cached = cache.open_cached('video')
+        self.assertTrue(cached.is_complete)
+        self.assertEqual(len(self.handler.ranges), 1)
+
+    def test_resume_with_range(self):
+        part_path = self.cache_dir / f"{self.cache._key('video')}.part"
+        part_path.write_bytes(self.data[:100000])
+
+        video = self.cache.open(self.url, key='video')
+        video.wait_for(len(self.data) + 1, timeout=10)
+        self.assertEqual(self.handler.ranges, ['bytes=100000-'])
+        self.assertEqual(video.path.read_bytes(), self.data)
+
+    def test_open_without_url_requires_cache(self):
+        self.assertIsNone(self.cache.open_cached('video'))
+        with self.assertRaises(ValueError):
+            self.cache.open(None, key='video')
+
+    def test_frames_while_downloading_match_the_file(self):
+        # Small chunks on a slow connection end the partial file inside a sample
+        self.handler.delay = 0.02
+        cache = remote_source.RemoteVideoCache(self.cache_dir, chunk_size=8192, retries=0, timeout=5)
+        video = cache.open(self.url, key='video')
+        frames = []
+        for image in remote_source.iter_frames(video, start_bytes=32 * 1024, poll_timeout=1):
+            if not frames:
+                # Inference has to start before the download finishes
+                self.assertFalse(video.is_complete)
+            frames.append(image)
+
+        reference = cv2.VideoCapture(str(VIDEO))
+        count = 0
+        while True:
+            success, image = reference.read()
+            if not success:
+                break
+            self.assertTrue(np.array_equal(frames[count], image), f'frame {count} differs')
+            count += 1
+        reference.release()
+        self.assertEqual(len(frames), count)
+
+
+
+class RemoteVideoCacheEvictionTest(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = Path(tempfile.mkdtemp())
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def _write(self, cache, key, suffix, size, mtime):
+        path = self.cache_dir / f'{cache._key(key)}{suffix}'
+        path.write_bytes(b'0' * size)
+        os.utime(path, (mtime, mtime))
+        return path
+
+    def test_evicts_least_recently_used_first(self):
+        cache = remote_source.RemoteVideoCache(self.cache_dir, max_bytes=2500)
+        old = self._write(cache, 'old', '.mp4', 1000, 1000)
+        middle = self._write(cache, 'middle', '.mp4', 1000, 2000)
+        new = self._write(cache, 'new', '.mp4', 1000, 3000)
+
+        cache.evict()
+        self.assertFalse(old.exists())
+        self.assertTrue(middle.exists())
+        self.assertTrue(new.exists())
+
+    def test_replay_marks_video_as_recently_used(self):
+        cache = remote_source.RemoteVideoCache(self.cache_dir, max_bytes=1500)
+        old = self._write(cache, 'old', '.mp4', 1000, 1000)
+        new = self._write(cache, 'new', '.mp4', 1000, 2000)
+
+        cache.open_cached('old')
+        cache.evict()
+        self.assertTrue(old.exists())
+        self.assertFalse(new.exists())
+
+    def test_evicts_orphaned_partial_downloads(self):
+        cache = remote_source.RemoteVideoCache(self.cache_dir, max_bytes=1000)
+        orphan = self._write(cache, 'orphan', '.part', 5000, 1000)
+        first = self._write(cache, 'first', '.mp4', 400, 2000)
+        second = self._write(cache, 'second', '.mp4', 400, 3000)
+
+        cache.evict()
+        self.assertFalse(orphan.exists())
+        self.assertTrue(first.exists())
+        self.assertTrue(second.exists())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+import sys
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import roi  # noqa: E402
+import settings  # noqa: E402
+
+
+class FakeBoxes:
+    def __init__(self, data):
+        self.data = data
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self
+
+
+class FakeResult:
+    """
+    The parts of an ultralytics result that `RegionOfInterest.map_result` uses.
+    """
+
+    def __init__(self, data, orig_shape):
+        self.boxes = FakeBoxes(np.asarray(data, dtype=np.float32))
+        self.orig_shape = orig_shape
+        self.orig_img = None
+
+    def update(self, boxes=None):
+        self.boxes = FakeBoxes(boxes)
+
+
+class RegionOfInterestTest(unittest.TestCase):
+
+    def setUp(self):
+        # Strip over rows 40-59 of a 100x200 frame
+        self.strip = roi.RegionOfInterest([(0, 0.4), (1, 0.4), (1, 0.6), (0, 0.6)])
+        self.frame = np.zeros((100, 200, 3), dtype=np.uint8)
+
+    def test_crop_is_the_bounding_box(self):
+        self.assertEqual(self.strip.crop(self.frame).shape, (20, 200, 3))
+
+    def test_boxes_map_back_to_full_frame(self):
+        # The model saw the 20x200 crop resized to 10x100
+        result = FakeResult([[10, 2, 30, 8, 0.9, 0]], orig_shape=(10, 100))
+        self.strip.map_result(result, self.frame)
+
+        np.testing.assert_allclose(result.boxes.data, [[20, 44, 60, 56, 0.9, 0]])
+        self.assertEqual(result.orig_shape, (100, 200))
+        self.assertIs(result.orig_img, self.frame)
+
+    def test_boxes_centered_outside_polygon_are_dropped(self):
+        # Triangle in the top left half, its bounding box is the whole frame
+        triangle = roi.RegionOfInterest([(0, 0), (1, 0), (0, 1)])
+        frame = np.zeros((101, 101, 3), dtype=np.uint8)
+        crop = triangle.crop(frame)
+        result = FakeResult([[5, 5, 15, 15, 0.9, 0], [80, 80, 100, 100, 0.8, 1]], orig_shape=crop.shape[:2])
+        triangle.map_result(result, frame)
+
+        np.testing.assert_allclose(result.boxes.data, [[5, 5, 15, 15, 0.9, 0]])
+
+    def test_region_too_small_for_frame(self):
+        thin = roi.RegionOfInterest([(0, 0.5), (1, 0.5), (1, 0.5005), (0, 0.5005)])
+        with self.assertRaises(ValueError):
+            thin.crop(np.zeros((480, 640, 3), dtype=np.uint8))
+
+
+class ValidatePolygonTest(unittest.TestCase):
+
+    def test_valid_polygon(self):
+        roi.validate_polygon([(0, 0.35), (1, 0.35), (1, 0.65), (0, 0.65)])
+
+    def test_invalid_polygons(self):
+        for polygon in ([(0, 0), (1, 1)],
+                        [(0, 0.5), (0.5, 0.5), (1, 0.5)],
+                        [(0, 0), (1.5, 0), (0, 1)]):
+            with self.subTest(polygon=polygon), self.assertRaises(ValueError):
+                roi.validate_polygon(polygon)
+
+    def test_get_source_roi_names_the_setting(self):
+        with mock.patch.dict(settings.CAMERA_ROI_POLYGONS, {'cam': [(0, 0), (1, 1)]}):
+            with self.assertRaisesRegex(ValueError, "CAMERA_ROI_POLYGONS entry for 'cam'"):
+                roi.get_source_roi(settings.RTSP, 'cam')
+
+    def test_get_source_roi_without_region(self):
+        with mock.patch.dict(settings.ROI_POLYGONS, {settings.RTSP: None}):
+            self.assertIsNone(roi.get_source_roi(settings.RTSP, 'cam'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,176 @@
+import sys
+import threading
+import time
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import session_resources  # noqa: E402
+
+
+def record(size):
+    return {'result': np.zeros(size, dtype=np.uint8)}
+
+
+class HistoryTest(unittest.TestCase):
+
+    def test_session_caps_evict_oldest_records(self):
+        manager = session_resources.SessionResourceManager(max_session_bytes=250, max_history=3,
+                                                           max_total_bytes=10000)
+        for size in (10, 20, 30, 40):
+            manager.add_history('a', record(size))
+        self.assertEqual([r['result'].size for r in manager.get_history('a')], [20, 30, 40])
+
+        manager.add_history('a', record(200))
+        self.assertEqual([r['result'].size for r in manager.get_history('a')], [40, 200])
+
+    def test_total_cap_evicts_least_recently_active_session_first(self):
+        manager = session_resources.SessionResourceManager(max_session_bytes=10000, max_history=10,
+                                                           max_total_bytes=300)
+        manager.add_history('old', record(100))
+        manager.add_history('old', record(100))
+        time.sleep(0.01)
+        manager.add_history('new', record(100))
+        time.sleep(0.01)
+        manager.add_history('new', record(100))
+
+        self.assertEqual(len(manager.get_history('old')), 1)
+        self.assertEqual(len(manager.get_history('new')), 2)
+
+
+class SweepTest(unittest.TestCase):
+
+    def test_disconnected_session_is_ended(self):
+        manager = session_resources.SessionResourceManager()
+        manager.begin_run('gone')
+        manager.add_history('gone', record(10))
+        manager.begin_run('here')
+        manager.add_history('here', record(10))
+
+        manager.sweep(is_active=lambda session_id: session_id == 'here')
+        self.assertTrue(manager.is_stopped('gone'))
+        self.assertEqual(manager.get_history('gone'), [])
+        self.assertFalse(manager.is_stopped('here'))
+        self.assertEqual(len(manager.get_history('here')), 1)
+
+    def test_idle_connected_session_keeps_history(self):
+        manager = session_resources.SessionResourceManager(idle_timeout=0)
+        manager.add_history('idle', record(10))
+        time.sleep(0.01)
+
+        manager.sweep(is_active=lambda session_id: True)
+        self.assertFalse(manager.is_stopped('idle'))
+        self.assertEqual(len(manager.get_history('idle')), 1)
+
+    def test_idle_session_is_ended_without_is_active(self):
+        manager = session_resources.SessionResourceManager(idle_timeout=0)
+        manager.add_history('idle', record(10))
+        time.sleep(0.01)
+
+        manager.sweep()
+        self.assertTrue(manager.is_stopped('idle'))
+        self.assertEqual(manager.get_history('idle'), [])
+
+        manager.begin_run('idle')
+        self.assertFalse(manager.is_stopped('idle'))
+
+    def test_recent_session_is_kept_without_is_active(self):
+        manager = session_resources.SessionResourceManager(idle_timeout=3600)
+        manager.add_history('recent', record(10))
+
+        manager.sweep()
+        self.assertFalse(manager.is_stopped('recent'))
+        self.assertEqual(len(manager.get_history('recent')), 1)
+
+    @mock.patch.object(session_resources.cv2, 'VideoCapture')
+    def test_ended_session_is_forgotten_once_captures_close(self, video_capture):
+        manager = session_resources.SessionResourceManager(idle_timeout=0)
+        with manager.capture('gone', 'rtsp://camera') as vid_cap:
+            manager.sweep(is_active=lambda session_id: False)
+            time.sleep(0.01)
+            manager.sweep(is_active=lambda session_id: False)
+            # Still tracked so the loop sees the stop request, and not released by the sweep
+            self.assertTrue(manager.is_stopped('gone'))
+            vid_cap.release.assert_not_called()
+        vid_cap.release.assert_called_once()
+
+        time.sleep(0.01)
+        manager.sweep(is_active=lambda session_id: False)
+        self.assertEqual(manager.usage(), [])
+        self.assertNotIn('gone', manager._sessions)
+
+
+@mock.patch.object(session_resources.cv2, 'VideoCapture')
+class CaptureTest(unittest.TestCase):
+
+    def test_capture_is_released_when_the_body_raises(self, video_capture):
+        manager = session_resources.SessionResourceManager()
+        with self.assertRaises(KeyError):
+            with manager.capture('a', 0) as vid_cap:
+                self.assertEqual(manager.usage('a')[0]['captures'], 1)
+                raise KeyError
+        vid_cap.release.assert_called_once()
+        self.assertEqual(manager.usage('a')[0]['captures'], 0)
+
+    def test_max_captures(self, video_capture):
+        manager = session_resources.SessionResourceManager(max_captures=1)
+        with manager.capture('a', 0):
+            with self.assertRaises(RuntimeError):
+                with manager.capture('a', 1):
+                    pass
+            # Other sessions have their own limit
+            with manager.capture('b', 1):
+                pass
+        with manager.capture('a', 1):
+            pass
+
+    def test_failed_open_frees_the_slot(self, video_capture):
+        manager = session_resources.SessionResourceManager(max_captures=1)
+        video_capture.side_effect = OSError
+        with self.assertRaises(OSError):
+            with manager.capture('a', 0):
+                pass
+
+        video_capture.side_effect = None
+        with manager.capture('a', 0):
+            pass
+
+    def test_slow_open_does_not_block_other_sessions(self, video_capture):
+        manager = session_resources.SessionResourceManager()
+        opening = threading.Event()
+        unblock = threading.Event()
+
+        def slow_open(source):
+            opening.set()
+            unblock.wait(5)
+            return mock.MagicMock()
+
+        video_capture.side_effect = slow_open
+
+        def run():
+            with manager.capture('slow', 'rtsp://unreachable'):
+                pass
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        try:
+            self.assertTrue(opening.wait(5))
+            swept = threading.Thread(target=manager.sweep, args=(lambda session_id: True,))
+            swept.start()
+            swept.join(1)
+            self.assertFalse(swept.is_alive())
+            # The slot is reserved while the capture opens
+            with self.assertRaises(RuntimeError):
+                with manager.capture('slow', 0):
+                    pass
+        finally:
+            unblock.set()
+            thread.join(5)
+
+
+if __name__ == '__main__':
+    unittest.main()